@@ -1,35 +1,47 @@
 import json
-import statistics
+import os
+import multiprocessing
 import fitz  # PyMuPDF
 from pathlib import Path
+from collections import Counter
 from itertools import groupby
 from operator import itemgetter
 
+try:
+    import orjson  # Faster encoder; output is byte-identical to the json.dump call below
+except ImportError:
+    orjson = None
+
 INPUT = Path("/app/input")
 OUTPUT = Path("/app/output")
 OUTPUT.mkdir(parents=True, exist_ok=True)
 
-def extract_spans(doc):
+def extract_spans(page, pno):
     spans = []
-    for pno, page in enumerate(doc):
-        blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_LIGATURES)["blocks"]
-        for block in blocks:
-            if block["type"] != 0:  # Skip non-text blocks
-                continue
-            for ln_no, line in enumerate(block["lines"], 1):
-                for span in line["spans"]:
-                    text = span["text"].strip()
-                    if text and len(text) > 1:  # Skip empty and single-char spans
-                        spans.append({
-                            "page": pno,
-                            "line": (pno, ln_no),
-                            "x": span["origin"][0],
-                            "size": round(span["size"], 1),  # Round to reduce precision
-                            "bold": bool(span["flags"] & 2),
-                            "text": text
-                        })
+    # Image blocks are not requested and off-page glyphs are dropped inside MuPDF
+    blocks = page.get_text("dict", flags=fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_MEDIABOX_CLIP)["blocks"]
+    for block in blocks:
+        if block["type"] != 0:  # Skip non-text blocks
+            continue
+        for ln_no, line in enumerate(block["lines"], 1):
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if text and len(text) > 1:  # Skip empty and single-char spans
+                    spans.append({
+                        "page": pno,
+                        "line": (pno, ln_no),
+                        "x": span["origin"][0],
+                        "size": round(span["size"], 1),  # Round to reduce precision
+                        "bold": bool(span["flags"] & 2),
+                        "text": text
+                    })
     return spans
 
+def extract_lines(doc):
+    # Merge page by page so only one page's spans are held in memory
+    for pno, page in enumerate(doc):
+        yield from merge_lines(extract_spans(page, pno))
+
 def merge_lines(spans):
     if not spans:
         return []
@@ -39,18 +51,19 @@ def merge_lines(spans):
 
     lines = []
     for _, group in groupby(spans, key=itemgetter("line")):
-        group_list = list(group)
-        if not group_list:
-            continue
+        # Collect text and the largest-font span in a single pass
+        texts = []
+        ref_span = None
+        for s in group:
+            texts.append(s["text"])
+            if ref_span is None or s["size"] > ref_span["size"]:
+                ref_span = s
 
         # Merge text
-        text = " ".join(s["text"] for s in group_list).strip()
+        text = " ".join(texts).strip()
         if not text:
             continue
 
-        # Use the largest font size as representative
-        ref_span = max(group_list, key=lambda s: s["size"])
-
         lines.append({
             "page": ref_span["page"],
             "text": text,
@@ -65,30 +78,35 @@ def classify_headings(lines):
         return None, []
 
     # Get font sizes for analysis
-    sizes = [ln["size"] for ln in lines]
-
-    # Use mode for body text detection, with fallback to median
-    try:
-        body_size = statistics.mode(sizes)
-    except statistics.StatisticsError:
-        body_size = statistics.median(sizes)
+    size_counts = Counter(ln["size"] for ln in lines)
 
-    title = None
-    outline = []
+    # Use the most common size as body text (ties go to the first seen, like statistics.mode)
+    body_size = size_counts.most_common(1)[0][0]
 
-    for ln in lines:
-        size_ratio = ln["size"] / body_size
+    # Sizes are rounded to 0.1pt, so classify each distinct size once
+    size_levels = {}
+    for size in size_counts:
+        size_ratio = size / body_size
 
-        # Classify based on size ratios and formatting
+        # Classify based on size ratios
         if size_ratio >= 1.8:
-            level = "TITLE"
+            size_levels[size] = "TITLE"
         elif size_ratio >= 1.4:
-            level = "H1"
+            size_levels[size] = "H1"
         elif size_ratio >= 1.2:
-            level = "H2"
-        elif size_ratio >= 1.05 or ln["bold"]:
-            level = "H3"
+            size_levels[size] = "H2"
+        elif size_ratio >= 1.05:
+            size_levels[size] = "H3"
         else:
+            size_levels[size] = None
+
+    title = None
+    outline = []
+
+    for ln in lines:
+        # Bold body-size lines fall back to H3
+        level = size_levels[ln["size"]] or ("H3" if ln["bold"] else None)
+        if level is None:
             continue
 
         # Handle title vs headings
@@ -106,10 +124,9 @@ def classify_headings(lines):
 def process_pdf(pdf_path):
     try:
         with fitz.open(pdf_path) as doc:
-            spans = extract_spans(doc)
+            lines = list(extract_lines(doc))
 
         # Process extracted data
-        lines = merge_lines(spans)
         title, outline = classify_headings(lines)
 
         return {
@@ -124,6 +141,13 @@ def process_pdf(pdf_path):
             "outline": []
         }
 
+def write_json(result, output_file):
+    if orjson is not None:
+        output_file.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    else:
+        with output_file.open("w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
 def main():
     pdf_files = list(INPUT.glob("*.pdf"))
 
@@ -131,17 +155,19 @@ def main():
         print("No PDF files found in /app/input")
         return
 
-    for pdf_path in pdf_files:
-        result = process_pdf(pdf_path)
-
-        # Write output
-        output_file = OUTPUT / f"{pdf_path.stem}.json"
-        try:
-            with output_file.open("w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            print(f"✓ {pdf_path.name} → {output_file.name}")
-        except Exception as e:
-            print(f"Error writing {output_file.name}: {e}")
+    # PDFs are independent, so parse them in parallel and write results in the driver
+    workers = min(len(pdf_files), os.cpu_count() or 1)
+    with multiprocessing.Pool(processes=workers) as pool:
+        results = pool.imap(process_pdf, pdf_files)
+
+        for pdf_path, result in zip(pdf_files, results):
+            # Write output
+            output_file = OUTPUT / f"{pdf_path.stem}.json"
+            try:
+                write_json(result, output_file)
+                print(f"✓ {pdf_path.name} → {output_file.name}")
+            except Exception as e:
+                print(f"Error writing {output_file.name}: {e}")
 
 if __name__ == "__main__":
     main()
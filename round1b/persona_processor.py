@@ -1,15 +1,39 @@
 import os
 import json
 from pathlib import Path
-from pypdf import PdfReader
+import fitz  # PyMuPDF
 from datetime import datetime
 import re
-from collections import defaultdict, Counter
+import heapq
+import multiprocessing
+from collections import Counter
+
+try:
+    import orjson  # Faster encoder; output is byte-identical to the json.dump call below
+except ImportError:
+    orjson = None
+
+# Stop words dropped from persona/job keywords
+COMMON_WORDS = frozenset({'the', 'and', 'but', 'for', 'are', 'with', 'this', 'that', 'have', 'from', 'they', 'know', 'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over', 'such', 'take', 'than', 'them', 'well', 'work'})
+
+# Heading patterns folded into one alternation so each line is matched once
+SECTION_HEADING_RE = re.compile(
+    r'\d+\.?\s+.+'                         # "1. Introduction"
+    r'|\d+\.\d+\.?\s+.+'                   # "1.1 Overview"
+    r'|[A-Z][A-Z\s]{2,50}$'                # "INTRODUCTION"
+    r'|[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:?$'  # "Chapter One:"
+    r'|Chapter\s+\d+'                      # "Chapter 1"
+    r'|Section\s+\d+'                      # "Section 1"
+)
+
+WORD_RE = re.compile(r'\w{3,}')  # Words of 3+ chars; a greedy run needs no \b anchors
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+STATS_RE = re.compile(r'\d+%|\$\d+|\d+\.\d+')  # Numbers/stats
 
 class PersonaBasedDocumentProcessor:
     def __init__(self):
-        self.persona_keywords = []
-        self.job_keywords = []
+        self.persona_keywords = frozenset()
+        self.job_keywords = frozenset()
         self.domain_patterns = {
             'travel': ['destination', 'hotel', 'restaurant', 'attraction', 'transport', 'booking', 'itinerary', 'sightseeing'],
             'research': ['methodology', 'analysis', 'data', 'study', 'findings', 'experiment', 'survey', 'results'],
@@ -18,6 +42,7 @@ class PersonaBasedDocumentProcessor:
             'healthcare': ['patient', 'treatment', 'medical', 'diagnosis', 'therapy', 'health', 'clinical', 'medicine'],
             'technology': ['software', 'development', 'programming', 'system', 'application', 'digital', 'tech', 'IT']
         }
+        self.domain_keyword_sets = {domain: frozenset(keywords) for domain, keywords in self.domain_patterns.items()}
 
     def load_persona_and_job(self, input_dir):
         try:
@@ -50,12 +75,11 @@ class PersonaBasedDocumentProcessor:
         for field in text_fields:
             if field in persona_data and isinstance(persona_data[field], str):
                 text = persona_data[field].lower()
-                words = re.findall(r'\b\w{3,}\b', text)  # Extract words 3+ chars
+                words = WORD_RE.findall(text)  # Extract words 3+ chars
                 self.persona_keywords.extend(words)
 
         # Remove duplicates and common words
-        common_words = {'the', 'and', 'but', 'for', 'are', 'with', 'this', 'that', 'have', 'from', 'they', 'know', 'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over', 'such', 'take', 'than', 'them', 'well', 'work'}
-        self.persona_keywords = list(set([k for k in self.persona_keywords if k not in common_words]))
+        self.persona_keywords = frozenset(k for k in self.persona_keywords if k not in COMMON_WORDS)
 
     def extract_job_keywords(self, job_data):
         self.job_keywords = []
@@ -66,22 +90,21 @@ class PersonaBasedDocumentProcessor:
         for field in text_fields:
             if field in job_data and isinstance(job_data[field], str):
                 text = job_data[field].lower()
-                words = re.findall(r'\b\w{3,}\b', text)
+                words = WORD_RE.findall(text)
                 self.job_keywords.extend(words)
 
         # Clean up
-        common_words = {'the', 'and', 'but', 'for', 'are', 'with', 'this', 'that', 'have', 'from', 'they', 'know', 'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over', 'such', 'take', 'than', 'them', 'well', 'work'}
-        self.job_keywords = list(set([k for k in self.job_keywords if k not in common_words]))
+        self.job_keywords = frozenset(k for k in self.job_keywords if k not in COMMON_WORDS)
 
     def extract_document_sections(self, pdf_path):
         try:
-            reader = PdfReader(pdf_path)
             sections = []
 
-            for page_num, page in enumerate(reader.pages, 1):
-                text = page.extract_text()
-                page_sections = self.detect_sections_in_text(text, page_num)
-                sections.extend(page_sections)
+            with fitz.open(pdf_path) as doc:
+                for page_num, page in enumerate(doc, 1):
+                    text = page.get_text("text")
+                    page_sections = self.detect_sections_in_text(text, page_num)
+                    sections.extend(page_sections)
 
             return sections
 
@@ -91,18 +114,18 @@ class PersonaBasedDocumentProcessor:
 
     def detect_sections_in_text(self, text, page_num):
         sections = []
-        lines = text.split('\n')
 
         current_section = None
         current_content = []
+        is_section_heading = self.is_section_heading  # Bound once for the per-line loop
 
-        for line in lines:
+        for line in text.split('\n'):
             line = line.strip()
             if not line:
                 continue
 
             # Check if this line is a section heading
-            if self.is_section_heading(line):
+            if is_section_heading(line):
                 # Save previous section
                 if current_section and current_content:
                     sections.append({
@@ -133,38 +156,30 @@ class PersonaBasedDocumentProcessor:
         if len(line) < 3 or len(line) > 100:
             return False
 
-        # Pattern matching for headings
-        patterns = [
-            r'^\d+\.?\s+.+',                    # "1. Introduction"
-            r'^\d+\.\d+\.?\s+.+',             # "1.1 Overview"  
-            r'^[A-Z][A-Z\s]{2,50}$',              # "INTRODUCTION"
-            r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*:?$', # "Chapter One:"
-            r'^Chapter\s+\d+',                   # "Chapter 1"
-            r'^Section\s+\d+',                   # "Section 1"
-        ]
-
-        return any(re.match(pattern, line) for pattern in patterns)
+        return SECTION_HEADING_RE.match(line) is not None
 
     def calculate_relevance_score(self, section):
         content_text = (section['title'] + ' ' + section['content']).lower()
-        words = re.findall(r'\b\w{3,}\b', content_text)
+        words = WORD_RE.findall(content_text)
 
         if not words:
             return 0.0
 
+        # Count each distinct word once; keyword matching then only visits the overlap
+        word_counts = Counter(words)
         score = 0.0
 
         # Persona keyword matching (2x weight)
-        persona_matches = sum(1 for word in words if word in self.persona_keywords)
+        persona_matches = sum(word_counts[word] for word in word_counts.keys() & self.persona_keywords)
         score += (persona_matches / len(words)) * 20
 
         # Job keyword matching (3x weight)  
-        job_matches = sum(1 for word in words if word in self.job_keywords)
+        job_matches = sum(word_counts[word] for word in word_counts.keys() & self.job_keywords)
         score += (job_matches / len(words)) * 30
 
         # Domain pattern matching
-        for domain, keywords in self.domain_patterns.items():
-            domain_matches = sum(1 for word in words if word in keywords)
+        for domain, keywords in self.domain_keyword_sets.items():
+            domain_matches = sum(word_counts[word] for word in word_counts.keys() & keywords)
             if domain_matches > 0:
                 score += (domain_matches / len(words)) * 10
 
@@ -179,7 +194,7 @@ class PersonaBasedDocumentProcessor:
             structure_score += 2
         if any(word in content_text for word in ['table', 'figure', 'chart', 'graph']):
             structure_score += 1
-        if re.search(r'\d+%|\$\d+|\d+\.\d+', content_text):  # Numbers/stats
+        if STATS_RE.search(content_text):  # Numbers/stats
             structure_score += 1
 
         total_score = score + length_score + sentence_score + structure_score
@@ -192,7 +207,7 @@ class PersonaBasedDocumentProcessor:
             return content
 
         # Split into sentences
-        sentences = re.split(r'[.!?]+', content)
+        sentences = SENTENCE_SPLIT_RE.split(content)
         scored_sentences = []
 
         for sentence in sentences:
@@ -200,19 +215,19 @@ class PersonaBasedDocumentProcessor:
                 continue
 
             # Score each sentence for relevance
-            words = re.findall(r'\b\w{3,}\b', sentence.lower())
-            sentence_score = 0
+            words = WORD_RE.findall(sentence.lower())
+            word_counts = Counter(words)
 
             # Persona/job keyword bonus
-            persona_matches = sum(1 for word in words if word in self.persona_keywords)
-            job_matches = sum(1 for word in words if word in self.job_keywords)
+            persona_matches = sum(word_counts[word] for word in word_counts.keys() & self.persona_keywords)
+            job_matches = sum(word_counts[word] for word in word_counts.keys() & self.job_keywords)
             sentence_score = persona_matches * 2 + job_matches * 3
 
             scored_sentences.append((sentence_score, sentence.strip()))
 
         # Select top sentences
-        scored_sentences.sort(key=lambda x: x[0], reverse=True)
-        selected_sentences = [s[1] for s in scored_sentences[:3]]  # Top 3 sentences
+        top_sentences = heapq.nlargest(3, scored_sentences, key=lambda x: x[0])
+        selected_sentences = [s[1] for s in top_sentences]  # Top 3 sentences
 
         refined_content = '. '.join(selected_sentences)
         if len(refined_content) > max_chars:
@@ -220,6 +235,30 @@ class PersonaBasedDocumentProcessor:
 
         return refined_content
 
+def write_json(result, output_file):
+    if orjson is not None:
+        output_file.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+# Per-worker processor, installed once by the pool initializer instead of pickled with every task
+_worker_processor = None
+
+def init_worker(processor):
+    global _worker_processor
+    _worker_processor = processor
+
+def score_document_sections(pdf_file):
+    processor = _worker_processor
+    sections = processor.extract_document_sections(pdf_file)
+
+    for section in sections:
+        section['document'] = pdf_file.name
+        section['relevance_score'] = processor.calculate_relevance_score(section)
+
+    return sections
+
 def process_persona_documents():
     input_dir = Path("/app/input")
     output_dir = Path("/app/output") 
@@ -245,22 +284,18 @@ def process_persona_documents():
     all_sections = []
     input_documents = []
 
-    for pdf_file in pdf_files:
-        print(f"Processing {pdf_file.name}...")
-        input_documents.append(pdf_file.name)
-
-        sections = processor.extract_document_sections(pdf_file)
-
-        for section in sections:
-            section['document'] = pdf_file.name
-            section['relevance_score'] = processor.calculate_relevance_score(section)
-            all_sections.append(section)
+    # Documents are parsed and scored in parallel; imap keeps input order so ties rank deterministically
+    workers = min(len(pdf_files), os.cpu_count() or 1)
+    with multiprocessing.Pool(processes=workers, initializer=init_worker, initargs=(processor,)) as pool:
+        results = pool.imap(score_document_sections, pdf_files)
 
-    # Sort sections by relevance score
-    all_sections.sort(key=lambda x: x['relevance_score'], reverse=True)
+        for pdf_file, sections in zip(pdf_files, results):
+            print(f"Processing {pdf_file.name}...")
+            input_documents.append(pdf_file.name)
+            all_sections.extend(sections)
 
-    # Select top sections for extraction
-    top_sections = all_sections[:5]  # Top 5 most relevant
+    # Select top sections for extraction (partial selection, no full sort)
+    top_sections = heapq.nlargest(5, all_sections, key=lambda x: x['relevance_score'])  # Top 5 most relevant
 
     # Create extracted sections
     extracted_sections = []
@@ -297,8 +332,7 @@ def process_persona_documents():
 
     # Save result
     output_file = output_dir / "challenge1b_output.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    write_json(result, output_file)
 
     print(f"✓ Processing complete!")
     print(f"✓ Total sections analyzed: {len(all_sections)}")